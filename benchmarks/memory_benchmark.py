@@ -0,0 +1,72 @@
+import os
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+# Run without opening a window or audio device
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # main.py loads images and sounds relative to the repo root
+
+import main
+
+COUNT = 100_000
+
+# Entity layouts as they were before __slots__ and shared unit types, kept for comparison
+class DictUnit:
+    def __init__(self, x, y, owner, unit_type):
+        self.x = x
+        self.y = y
+        self.owner = owner
+        self.moves = main.UNIT_STATS[unit_type]['Moves']
+        self.max_moves = main.UNIT_STATS[unit_type]['Moves']
+        self.unit_type = unit_type
+        self.health = main.UNIT_STATS[unit_type]['Health']
+
+class DictTile:
+    def __init__(self, x, y, terrain_type):
+        self.x = x
+        self.y = y
+        self.terrain_type = terrain_type
+        self.unit = None
+        self.city = None
+        self.improvement = None
+        self.highlight = False
+
+def bytes_per_entity(factory):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = [factory(i) for i in range(COUNT)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Don't count the list holding the entities
+    return (after - before - sys.getsizeof(entities)) / COUNT
+
+def main_benchmark():
+    # A one-tile map is enough for the pool's check that released units are off the map
+    owner = SimpleNamespace(units=[], game_map=SimpleNamespace(tiles=[[SimpleNamespace(unit=None)]]))
+    results = [
+        ('Unit', bytes_per_entity(lambda i: DictUnit(i % 100, i // 100, owner, 'Warrior')),
+         bytes_per_entity(lambda i: main.Unit(i % 100, i // 100, owner, 'Warrior'))),
+        ('Tile', bytes_per_entity(lambda i: DictTile(i % 100, i // 100, 'Plains')),
+         bytes_per_entity(lambda i: main.Tile(i % 100, i // 100, 'Plains'))),
+    ]
+    print(f"Bytes per entity at {COUNT} entities")
+    print(f"{'Entity':<8}{'Before':>10}{'After':>10}{'Saved':>10}")
+    for name, before, after in results:
+        print(f"{name:<8}{before:>10.1f}{after:>10.1f}{1 - after / before:>10.0%}")
+
+    # Churn through the pool the way production, combat and city founding do
+    pool = main.UnitPool()
+    for turn in range(100):
+        units = [pool.acquire(0, 0, owner, 'Warrior') for _ in range(1000)]
+        for unit in units:
+            pool.release(unit)
+        pool.recycle()
+    print(f"Unit pool: {pool.created} created, {pool.reused} reused")
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -1,18 +1,67 @@
 import pygame
 import sys
+import os
+import gc
+import json
+import time
 import random
+import threading
+import tracemalloc
+import http.server
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 # Initialize Pygame and Mixer
 pygame.init()
 pygame.mixer.init()
 
+# Read an optional setting from the environment; unset, empty or invalid values fall back to the default
+def read_env(name, parse, default=None):
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        print(f"Ignoring invalid {name}={value!r}")
+        return default
+
+def parse_port(value):
+    port = int(value)
+    if not 0 <= port <= 65535:
+        raise ValueError(value)
+    return port
+
+def parse_interval(value):
+    interval = float(value)
+    if not interval > 0:
+        raise ValueError(value)
+    return interval
+
 # Constants
 WIDTH, HEIGHT = 1024, 768
 TILE_SIZE = 64
+ZOOM_LEVELS = (4, 8, 16, 32, 48, 64, 96)  # Tile sizes in pixels
+OVERVIEW_TILE_SIZE = 16  # Below this the map is drawn from a downsampled terrain texture
+SPRITE_CACHE_BUDGET = 32 * 1024 * 1024  # Bytes of pre-scaled surfaces kept across zoom levels
 MAP_WIDTH = 10
 MAP_HEIGHT = 10
 BUTTON_WIDTH = 200
 BUTTON_HEIGHT = 50
+MINIMAP_SIZE = 160
+SIM_STEP = 1 / 30  # Fixed simulation timestep in seconds, independent of render FPS
+MAX_SIM_STEPS = 5  # Simulation steps allowed per frame before dropping time
+MAX_ANIMATIONS = 64  # Units beyond this snap to their destination instead of animating
+MOVE_STEP_TIME = 0.15  # Seconds to slide one tile
+ATTACK_TIME = 0.25  # Seconds for an attack lunge
+METRICS_PORT = read_env('CIV_METRICS_PORT', parse_port)  # Unset disables the metrics endpoint, 0 picks a free port
+METRICS_JSON_PATH = read_env('CIV_METRICS_JSON', str)  # Unset disables the periodic JSON dump
+METRICS_DUMP_INTERVAL = read_env('CIV_METRICS_INTERVAL', parse_interval, 60)  # Seconds between JSON dumps
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)  # Seconds
 FONT = pygame.font.SysFont(None, 24)
 
 # Colors
@@ -28,6 +77,22 @@ RED = (255, 0, 0)
 LIGHT_BLUE = (173, 216, 230)
 ORANGE = (255, 165, 0)
 
+# Arrow keys pan the camera by one tile
+CAMERA_PAN_KEYS = {
+    pygame.K_LEFT: (-1, 0),
+    pygame.K_RIGHT: (1, 0),
+    pygame.K_UP: (0, -1),
+    pygame.K_DOWN: (0, 1),
+}
+
+# Terrain Colors
+TERRAIN_COLORS = {
+    'Plains': GREEN,
+    'Water': BLUE,
+    'Mountain': GRAY,
+    'Forest': DARK_GRAY,
+}
+
 # Initialize Pygame Window
 window = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Civilization Clone")
@@ -91,6 +156,53 @@ IMAGES = {
     'close_icon': load_image('close_icon.png', scale=32),  # Add a close icon
 }
 
+# Sprite Cache Class
+# Sprites and terrain are scaled once per zoom level on first use and then only
+# blitted. Least recently used surfaces are evicted to stay within the budget.
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+class SpriteCache:
+    def __init__(self, budget=SPRITE_CACHE_BUDGET):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, build):
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = build()
+        self.entries[key] = surface
+        self.used += surface_bytes(surface)
+        # Never evict the surface that was just built
+        while self.used > self.budget and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.used -= surface_bytes(evicted)
+        return surface
+
+    def get(self, name, size):
+        image = IMAGES.get(name, None)
+        if image is None or image.get_width() == size:
+            return image
+        return self.lookup((name, size), lambda: pygame.transform.scale(image, (size, size)))
+
+    def terrain(self, terrain_type, size):
+        def build():
+            surface = pygame.Surface((size, size)).convert()
+            surface.fill(TERRAIN_COLORS.get(terrain_type, BROWN))
+            return surface
+        return self.lookup(('terrain', terrain_type, size), build)
+
+    def terrain_map(self, game_map, size):
+        return self.lookup(('terrain_map', size), lambda: pygame.transform.scale(
+            game_map.terrain_texture(), (MAP_WIDTH * size, MAP_HEIGHT * size)).convert())
+
 # Unit Statistics
 UNIT_STATS = {
     'Settler': {'Moves': 2, 'Strength': 0, 'Health': 1},
@@ -98,6 +210,19 @@ UNIT_STATS = {
     'Worker': {'Moves': 2, 'Strength': 0, 'Health': 1},
 }
 
+# Unit Type Class
+# Shared, read-only per-type data so individual units don't repeat it
+class UnitType:
+    __slots__ = ('name', 'max_moves', 'strength', 'max_health')
+
+    def __init__(self, name, stats):
+        self.name = name
+        self.max_moves = stats['Moves']
+        self.strength = stats['Strength']
+        self.max_health = stats['Health']
+
+UNIT_TYPES = {name: UnitType(name, stats) for name, stats in UNIT_STATS.items()}
+
 # Production Costs
 PRODUCTION_COSTS = {
     'Settler': 10,
@@ -110,6 +235,13 @@ PRODUCTION_COSTS = {
 # Buildings List
 BUILDINGS = ['Granary', 'Monument']
 
+# Improvement a worker builds on each terrain type
+TERRAIN_IMPROVEMENTS = {
+    'Plains': 'Farm',
+    'Forest': 'Farm',
+    'Mountain': 'Mine',
+}
+
 # Technology Tree
 class Technology:
     def __init__(self):
@@ -158,6 +290,8 @@ class Technology:
 
 # Button Class with Hover Effect and Icons
 class Button:
+    __slots__ = ('rect', 'text', 'icon', 'color', 'hover_color', 'current_color', 'callback', 'text_color', 'font')
+
     def __init__(self, text, x, y, width, height, callback, icon=None, color=GRAY, hover_color=DARK_GRAY, text_color=WHITE):
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
@@ -200,14 +334,27 @@ class Button:
 
 # Unit Class
 class Unit:
+    __slots__ = ('x', 'y', 'owner', 'kind', 'moves', 'health')
+
     def __init__(self, x, y, owner, unit_type):
+        self.reset(x, y, owner, unit_type)
+
+    def reset(self, x, y, owner, unit_type):
+        # Also used to reinitialise a pooled unit
         self.x = x
         self.y = y
         self.owner = owner
-        self.moves = UNIT_STATS[unit_type]['Moves']
-        self.max_moves = UNIT_STATS[unit_type]['Moves']
-        self.unit_type = unit_type
-        self.health = UNIT_STATS[unit_type]['Health']
+        self.kind = UNIT_TYPES[unit_type]
+        self.moves = self.kind.max_moves
+        self.health = self.kind.max_health
+
+    @property
+    def unit_type(self):
+        return self.kind.name
+
+    @property
+    def max_moves(self):
+        return self.kind.max_moves
 
     def move_unit(self, dx, dy, game_map):
         new_x = self.x + dx
@@ -223,9 +370,11 @@ class Unit:
                 elif not target_tile.unit:
                     # Move unit
                     game_map.tiles[self.y][self.x].unit = None
+                    game_map.mark_changed(self.x, self.y)
                     self.x = new_x
                     self.y = new_y
                     target_tile.unit = self
+                    game_map.mark_changed(new_x, new_y)
                     self.moves -= 1
                     print(f"{self.unit_type} moved to ({self.x}, {self.y})")
                     if move_sound:
@@ -242,11 +391,13 @@ class Unit:
         print(f"{self.unit_type} attacks {enemy_unit.unit_type}!")
         if attack_sound:
             attack_sound.play()
-        enemy_unit.health -= UNIT_STATS[self.unit_type]['Strength']
+        enemy_unit.health -= self.kind.strength
         if enemy_unit.health <= 0:
             print(f"{enemy_unit.unit_type} defeated!")
             enemy_unit.owner.units.remove(enemy_unit)
             self.owner.game_map.tiles[enemy_unit.y][enemy_unit.x].unit = None
+            self.owner.game_map.mark_changed(enemy_unit.x, enemy_unit.y)
+            UNIT_POOL.release(enemy_unit)
             if production_complete_sound:
                 production_complete_sound.play()
         self.moves -= 1
@@ -265,6 +416,8 @@ class Unit:
         # Remove unit after founding a city
         self.owner.units.remove(self)
         tile.unit = None
+        game_map.mark_changed(self.x, self.y)
+        UNIT_POOL.release(self)
         print(f"City founded at ({self.x}, {self.y})")
         if build_sound:
             build_sound.play()
@@ -274,14 +427,11 @@ class Unit:
         if tile.improvement:
             print("An improvement already exists here.")
             return
-        if tile.terrain_type in ['Plains', 'Forest']:
-            tile.improvement = 'Farm'
-            print("Farm built.")
-            if build_sound:
-                build_sound.play()
-        elif tile.terrain_type == 'Mountain':
-            tile.improvement = 'Mine'
-            print("Mine built.")
+        improvement = TERRAIN_IMPROVEMENTS.get(tile.terrain_type)
+        if improvement:
+            tile.improvement = improvement
+            game_map.mark_changed(self.x, self.y)
+            print(f"{improvement} built.")
             if build_sound:
                 build_sound.play()
         else:
@@ -289,8 +439,52 @@ class Unit:
             return
         self.moves -= 1
 
+# Unit Pool Class
+class UnitPool:
+    def __init__(self):
+        self.free = []
+        # Removed units wait here until the undo history is cleared at turn end,
+        # since snapshots may still bring them back
+        self.retired = set()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, x, y, owner, unit_type):
+        if self.free:
+            unit = self.free.pop()
+            unit.reset(x, y, owner, unit_type)
+            self.reused += 1
+        else:
+            unit = Unit(x, y, owner, unit_type)
+            self.created += 1
+        return unit
+
+    def release(self, unit):
+        self.retired.add(unit)
+
+    def recycle(self):
+        # Skip units an undo brought back into play, checking each owner's units once.
+        # A unit still referenced by a tile is never reused, so it can't end up on two tiles.
+        live_units = {}
+        for unit in self.retired:
+            owner_units = live_units.get(id(unit.owner))
+            if owner_units is None:
+                owner_units = live_units[id(unit.owner)] = set(unit.owner.units)
+            if unit in owner_units:
+                continue
+            if unit.owner.game_map.tiles[unit.y][unit.x].unit is unit:
+                print(f"{unit.unit_type} at ({unit.x}, {unit.y}) is still on the map and won't be reused.")
+                continue
+            self.free.append(unit)
+        self.retired.clear()
+
+UNIT_POOL = UnitPool()
+
 # City Class
 class City:
+    __slots__ = ('x', 'y', 'owner', 'name', 'population', 'food', 'food_required',
+                 'production_queue', 'production_progress', 'yields')
+
     def __init__(self, x, y, owner):
         self.x = x
         self.y = y
@@ -330,9 +524,10 @@ class City:
 
     def complete_production(self, item):
         if item in UNIT_STATS:
-            new_unit = Unit(self.x, self.y, self.owner, item)
+            new_unit = UNIT_POOL.acquire(self.x, self.y, self.owner, item)
             self.owner.units.append(new_unit)
             self.owner.game_map.tiles[self.y][self.x].unit = new_unit
+            self.owner.game_map.mark_changed(self.x, self.y)
             print(f"{item} produced in {self.name}!")
             if production_complete_sound:
                 production_complete_sound.play()
@@ -355,55 +550,50 @@ class City:
 
 # Tile Class
 class Tile:
+    __slots__ = ('x', 'y', 'terrain_type', 'unit', 'city', 'improvement', 'highlight')
+
     def __init__(self, x, y, terrain_type):
-        self.rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        self.x = x
+        self.y = y
         self.terrain_type = terrain_type
         self.unit = None
         self.city = None
         self.improvement = None
         self.highlight = False
 
-    def draw(self, surface):
-        # Choose color based on terrain
-        if self.terrain_type == 'Plains':
-            color = GREEN
-        elif self.terrain_type == 'Water':
-            color = BLUE
-        elif self.terrain_type == 'Mountain':
-            color = GRAY
-        elif self.terrain_type == 'Forest':
-            color = DARK_GRAY
-        else:
-            color = BROWN
-
-        pygame.draw.rect(surface, color, self.rect)
+    def draw(self, surface, rect, sprites, hidden_units=()):
+        # Sprites come pre-scaled to the current zoom level
+        size = rect.width
+        surface.blit(sprites.terrain(self.terrain_type, size), rect)
 
         # Highlight if selected
         if self.highlight:
-            pygame.draw.rect(surface, YELLOW, self.rect, 3)
+            pygame.draw.rect(surface, YELLOW, rect, 3)
 
         # Draw improvements
         if self.improvement:
-            image = IMAGES.get(self.improvement, None)
+            image = sprites.get(self.improvement, size)
             if image:
-                surface.blit(image, self.rect)
+                surface.blit(image, rect)
 
         # Draw city
         if self.city:
-            image = IMAGES.get('City', None)
+            image = sprites.get('City', size)
             if image:
-                surface.blit(image, self.rect)
+                surface.blit(image, rect)
 
-        # Draw unit
-        if self.unit:
-            image = IMAGES.get(self.unit.unit_type, None)
+        # Draw unit, unless it is being drawn by an animation
+        if self.unit and self.unit not in hidden_units:
+            image = sprites.get(self.unit.unit_type, size)
             if image:
-                surface.blit(image, self.rect)
+                surface.blit(image, rect)
 
 # GameMap Class
 class GameMap:
     def __init__(self):
         self.tiles = self.generate_map()
+        # Coordinates of tiles whose unit, city or improvement changed since the last sync
+        self.changed_tiles = set()
 
     def generate_map(self):
         tiles = []
@@ -420,13 +610,271 @@ class GameMap:
             tiles.append(row)
         return tiles
 
-    def draw(self, surface):
-        for row in self.tiles:
+    def terrain_texture(self):
+        # Bulk-write one RGB pixel per tile from the terrain grid
+        pixels = b''.join(bytes(TERRAIN_COLORS.get(tile.terrain_type, BROWN))
+                          for row in self.tiles for tile in row)
+        return pygame.image.frombuffer(pixels, (MAP_WIDTH, MAP_HEIGHT), 'RGB')
+
+    def draw(self, surface, camera, sprites, hidden_units=()):
+        # Only tiles inside the camera viewport are drawn
+        x_range, y_range = camera.visible_range()
+        for y in y_range:
+            row = self.tiles[y]
+            for x in x_range:
+                row[x].draw(surface, camera.tile_rect(x, y), sprites, hidden_units)
+
+    def draw_overview(self, surface, camera, sprites, players, hidden_units=()):
+        # Zoomed far out: one blit of the scaled terrain texture, then only cities and units
+        size = camera.tile_size
+        surface.blit(sprites.terrain_map(self, size), camera.to_screen(0, 0))
+        for player in players:
+            for city in player.cities:
+                surface.blit(sprites.get('City', size), camera.to_screen(city.x, city.y))
+            for unit in player.units:
+                if unit not in hidden_units:
+                    surface.blit(sprites.get(unit.unit_type, size), camera.to_screen(unit.x, unit.y))
+
+    def mark_changed(self, x, y):
+        self.changed_tiles.add((x, y))
+
+    def take_changes(self):
+        changes = self.changed_tiles
+        self.changed_tiles = set()
+        return changes
+
+# Camera Class
+class Camera:
+    def __init__(self, viewport):
+        self.viewport = viewport
+        self.zoom_index = ZOOM_LEVELS.index(TILE_SIZE)
+        self.tile_size = TILE_SIZE
+        self.offset_x = 0  # Pixel offset of the viewport into the map
+        self.offset_y = 0
+
+    def visible_range(self):
+        size = self.tile_size
+        first_x = self.offset_x // size
+        first_y = self.offset_y // size
+        last_x = min(MAP_WIDTH, (self.offset_x + self.viewport.width) // size + 1)
+        last_y = min(MAP_HEIGHT, (self.offset_y + self.viewport.height) // size + 1)
+        return range(first_x, last_x), range(first_y, last_y)
+
+    def to_screen(self, x, y):
+        # Tile coordinates (possibly fractional) to screen pixels
+        return (self.viewport.x + round(x * self.tile_size) - self.offset_x,
+                self.viewport.y + round(y * self.tile_size) - self.offset_y)
+
+    def tile_rect(self, x, y):
+        return pygame.Rect(self.to_screen(x, y), (self.tile_size, self.tile_size))
+
+    def screen_to_tile(self, pos):
+        if not self.viewport.collidepoint(pos):
+            return None
+        return ((pos[0] - self.viewport.x + self.offset_x) // self.tile_size,
+                (pos[1] - self.viewport.y + self.offset_y) // self.tile_size)
+
+    def center(self):
+        # Map position at the middle of the viewport, in fractional tiles
+        return ((self.offset_x + self.viewport.width / 2) / self.tile_size,
+                (self.offset_y + self.viewport.height / 2) / self.tile_size)
+
+    def look_at(self, x, y):
+        self.offset_x = int(x * self.tile_size - self.viewport.width / 2)
+        self.offset_y = int(y * self.tile_size - self.viewport.height / 2)
+        self.clamp()
+
+    def center_on(self, x, y):
+        self.look_at(x + 0.5, y + 0.5)
+
+    def clamp(self):
+        max_x = max(0, MAP_WIDTH * self.tile_size - self.viewport.width)
+        max_y = max(0, MAP_HEIGHT * self.tile_size - self.viewport.height)
+        self.offset_x = min(max(0, self.offset_x), max_x)
+        self.offset_y = min(max(0, self.offset_y), max_y)
+
+    def pan(self, dx, dy):
+        self.offset_x += dx * self.tile_size
+        self.offset_y += dy * self.tile_size
+        self.clamp()
+
+    def zoom(self, step):
+        index = min(max(0, self.zoom_index + step), len(ZOOM_LEVELS) - 1)
+        if index == self.zoom_index:
+            return
+        # Keep the same part of the map in the middle of the view
+        x, y = self.center()
+        self.zoom_index = index
+        self.tile_size = ZOOM_LEVELS[index]
+        self.look_at(x, y)
+
+# Minimap Class
+class Minimap:
+    def __init__(self, game_map, player, rect):
+        self.game_map = game_map
+        self.player = player
+        # Whole pixels per tile so a changed tile maps to an exact block
+        self.scale = max(1, min(rect.width // MAP_WIDTH, rect.height // MAP_HEIGHT))
+        self.rect = pygame.Rect(0, 0, MAP_WIDTH * self.scale, MAP_HEIGHT * self.scale)
+        self.rect.bottomleft = rect.bottomleft
+        self.build()
+
+    def build(self):
+        # Scale the one-pixel-per-tile terrain texture up once
+        self.surface = pygame.transform.scale(self.game_map.terrain_texture(), self.rect.size).convert()
+        for row in self.game_map.tiles:
             for tile in row:
-                tile.draw(surface)
+                if tile.unit or tile.city:
+                    self.patch(tile.x, tile.y)
+
+    def tile_color(self, tile):
+        if tile.city:
+            return WHITE if tile.city.owner == self.player else ORANGE
+        if tile.unit:
+            return YELLOW if tile.unit.owner == self.player else RED
+        return TERRAIN_COLORS.get(tile.terrain_type, BROWN)
+
+    def patch(self, x, y):
+        tile = self.game_map.tiles[y][x]
+        self.surface.fill(self.tile_color(tile), (x * self.scale, y * self.scale, self.scale, self.scale))
+
+    def update(self, changes):
+        # Only tiles that changed since the last sync are repainted
+        for x, y in changes:
+            self.patch(x, y)
+
+    def draw(self, surface, camera):
+        surface.blit(self.surface, self.rect)
+        # Outline the part of the map currently in view
+        size = camera.tile_size
+        view = pygame.Rect(self.rect.x + camera.offset_x * self.scale // size,
+                           self.rect.y + camera.offset_y * self.scale // size,
+                           camera.viewport.width * self.scale // size,
+                           camera.viewport.height * self.scale // size).clip(self.rect)
+        pygame.draw.rect(surface, WHITE, view, 1)
+        pygame.draw.rect(surface, BLACK, self.rect, 1)
+
+    def screen_to_tile(self, pos):
+        if not self.rect.collidepoint(pos):
+            return None
+        return ((pos[0] - self.rect.x) // self.scale, (pos[1] - self.rect.y) // self.scale)
+
+# Legal Action Cache
+class UnitActions:
+    def __init__(self):
+        self.reachable = {}  # (x, y) -> previous step on the shortest path
+        self.attacks = {}  # (x, y) of an enemy -> tile the attack is made from
+        self.examined = set()  # Every tile the result depends on
+        self.can_found = False
+        self.can_improve = False
+
+class LegalActions:
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.actions = {}
+        self.hits = 0  # Lookups and patches answered from the cache
+        self.misses = 0  # Units that had to be recomputed
+
+    def rebuild(self, units):
+        # Done once at turn start, when every unit has its moves back
+        self.actions = {unit: self.compute(unit) for unit in units}
+
+    def compute(self, unit):
+        self.misses += 1
+        actions = UnitActions()
+        tiles = self.game_map.tiles
+        start = (unit.x, unit.y)
+        tile = tiles[unit.y][unit.x]
+        actions.examined.add(start)
+        actions.can_found = unit.unit_type == 'Settler' and not tile.city
+        actions.can_improve = (unit.unit_type == 'Worker' and unit.moves > 0
+                               and not tile.improvement and tile.terrain_type in TERRAIN_IMPROVEMENTS)
+
+        # Breadth-first search over passable tiles, one move per step
+        frontier = [start]
+        moves_left = unit.moves
+        while frontier and moves_left > 0:
+            next_frontier = []
+            for x, y in frontier:
+                for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < MAP_WIDTH and 0 <= ny < MAP_HEIGHT):
+                        continue
+                    pos = (nx, ny)
+                    actions.examined.add(pos)
+                    if pos == start or pos in actions.reachable:
+                        continue
+                    target = tiles[ny][nx]
+                    if target.terrain_type == 'Water':
+                        continue
+                    if target.unit:
+                        if target.unit.owner != unit.owner and pos not in actions.attacks:
+                            actions.attacks[pos] = (x, y)
+                        continue
+                    actions.reachable[pos] = (x, y)
+                    next_frontier.append(pos)
+            frontier = next_frontier
+            moves_left -= 1
+        return actions
+
+    def update(self, units, changed_tiles, acted_units=()):
+        # Patch only units that acted or whose search touched a changed tile
+        current = set(units)
+        for unit in list(self.actions):
+            if unit not in current:
+                del self.actions[unit]
+        for unit in units:
+            actions = self.actions.get(unit)
+            if actions is None or unit in acted_units or not actions.examined.isdisjoint(changed_tiles):
+                self.actions[unit] = self.compute(unit)
+            else:
+                self.hits += 1
+
+    def get(self, unit, count_hit=False):
+        # Drawing reads the cache every frame, so only action lookups count as hits
+        actions = self.actions.get(unit)
+        if actions is None:
+            if unit not in unit.owner.units:
+                # Units that founded a city or were defeated can't act and are never cached
+                return UnitActions()
+            actions = self.actions[unit] = self.compute(unit)
+        elif count_hit:
+            self.hits += 1
+        return actions
+
+    def path_to(self, unit, x, y):
+        # Steps from the unit's tile to (x, y), excluding the starting tile
+        actions = self.get(unit, count_hit=True)
+        pos = (x, y)
+        if pos in actions.attacks:
+            path = [pos]
+            pos = actions.attacks[pos]
+        elif pos in actions.reachable:
+            path = []
+        else:
+            return None
+        while pos != (unit.x, unit.y):
+            path.append(pos)
+            pos = actions.reachable[pos]
+        path.reverse()
+        return path
+
+    def enumerate_actions(self, unit):
+        # Flat list of everything the unit can do this turn, e.g. for AI agents
+        actions = self.get(unit, count_hit=True)
+        options = [('move', pos) for pos in actions.reachable]
+        options.extend(('attack', pos) for pos in actions.attacks)
+        if actions.can_found:
+            options.append(('found_city', (unit.x, unit.y)))
+        if actions.can_improve:
+            options.append(('build_improvement', (unit.x, unit.y)))
+        return options
 
 # Player Class
 class Player:
+    # Only these are restored by undo; selection and open menus are left alone
+    STATE_FIELDS = ('units', 'cities', 'resources')
+
     def __init__(self, name, game_map):
         self.name = name
         self.units = []
@@ -441,19 +889,25 @@ class Player:
 
         # Starting unit
         start_x, start_y = MAP_WIDTH // 2, MAP_HEIGHT // 2
-        starting_unit = Unit(start_x, start_y, self, 'Settler')
+        starting_unit = UNIT_POOL.acquire(start_x, start_y, self, 'Settler')
         self.units.append(starting_unit)
         game_map.tiles[start_y][start_x].unit = starting_unit
 
     def end_turn(self):
-        for unit in self.units[:]:
-            unit.reset_moves()
-        for city in self.cities:
-            city.produce()
-        self.technology.advance_research()
-        # Simple Gold generation based on number of cities
-        self.resources['Gold'] += len(self.cities)
-        print(f"Gold increased to {self.resources['Gold']}")
+        with TURN_SECONDS.time():
+            with TURN_PHASE_SECONDS['units'].time():
+                for unit in self.units[:]:
+                    unit.reset_moves()
+            with TURN_PHASE_SECONDS['cities'].time():
+                for city in self.cities:
+                    city.produce()
+            with TURN_PHASE_SECONDS['research'].time():
+                self.technology.advance_research()
+            with TURN_PHASE_SECONDS['gold'].time():
+                # Simple Gold generation based on number of cities
+                self.resources['Gold'] += len(self.cities)
+                print(f"Gold increased to {self.resources['Gold']}")
+        TURNS_TOTAL.inc()
         if notification_sound:
             notification_sound.play()
 
@@ -462,6 +916,441 @@ class Player:
         if click_sound:
             click_sound.play()
 
+# Unit Animation Classes
+class UnitSprite(pygame.sprite.DirtySprite):
+    def __init__(self, unit):
+        super().__init__()
+        self.image = IMAGES.get(unit.unit_type)
+        self.rect = self.image.get_rect()
+        self.dirty = 2  # The map is repainted every frame, so always redraw
+
+class Animation:
+    def __init__(self, unit, waypoints, attack_target=None):
+        self.unit = unit
+        self.waypoints = waypoints
+        self.attack_target = attack_target
+        self.duration = (len(waypoints) - 1) * MOVE_STEP_TIME + (ATTACK_TIME if attack_target else 0)
+        self.elapsed = 0
+        self.position = self.previous_position = self.position_at(0)
+        self.sprite = UnitSprite(unit)
+
+    def position_at(self, elapsed):
+        # Position in tile units along the waypoints, followed by an optional lunge
+        move_time = (len(self.waypoints) - 1) * MOVE_STEP_TIME
+        if elapsed < move_time:
+            index = int(elapsed / MOVE_STEP_TIME)
+            t = elapsed / MOVE_STEP_TIME - index
+            (x0, y0), (x1, y1) = self.waypoints[index], self.waypoints[index + 1]
+            return (x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+        x0, y0 = self.waypoints[-1]
+        if not self.attack_target:
+            return (x0, y0)
+        # Go halfway towards the target and back
+        t = min((elapsed - move_time) / ATTACK_TIME, 1)
+        reach = 0.5 * (1 - abs(2 * t - 1))
+        x1, y1 = self.attack_target
+        return (x0 + (x1 - x0) * reach, y0 + (y1 - y0) * reach)
+
+    def step(self, dt):
+        self.elapsed += dt
+        self.previous_position = self.position
+        self.position = self.position_at(min(self.elapsed, self.duration))
+        return self.elapsed >= self.duration
+
+class Animator:
+    def __init__(self):
+        self.animations = {}
+        self.sprites = pygame.sprite.LayeredDirty()
+
+    def move(self, unit, waypoints, attack_target=None):
+        if unit in self.animations:
+            self.finish(unit)
+        if len(waypoints) < 2 and not attack_target:
+            return
+        if len(self.animations) >= MAX_ANIMATIONS:
+            return  # Over the cap the unit is simply drawn at its destination
+        animation = Animation(unit, waypoints, attack_target)
+        self.animations[unit] = animation
+        self.sprites.add(animation.sprite)
+
+    def finish(self, unit):
+        animation = self.animations.pop(unit)
+        self.sprites.remove(animation.sprite)
+
+    def clear(self):
+        self.animations.clear()
+        self.sprites.empty()
+
+    def step(self, dt):
+        for unit, animation in list(self.animations.items()):
+            if animation.step(dt):
+                self.finish(unit)
+
+    def draw(self, surface, camera, sprites, alpha):
+        # Interpolate between the last two simulation steps for smooth motion at any frame rate
+        size = camera.tile_size
+        for animation in self.animations.values():
+            sprite = animation.sprite
+            if sprite.rect.width != size:
+                sprite.image = sprites.get(animation.unit.unit_type, size)
+                sprite.rect = sprite.image.get_rect()
+            (px, py), (x, y) = animation.previous_position, animation.position
+            sprite.rect.topleft = camera.to_screen(px + (x - px) * alpha, py + (y - py) * alpha)
+        self.sprites.draw(surface)
+
+# Undo History Class
+# Snapshots are copy-on-write: an action only records the objects it may touch,
+# and only entries that actually changed are kept, so memory scales with the
+# size of the change rather than the size of the map.
+def state_fields(obj):
+    # Classes that mix game state with UI state list the fields worth snapshotting
+    fields = getattr(type(obj), 'STATE_FIELDS', None) or getattr(type(obj), '__slots__', None)
+    return fields if fields is not None else list(vars(obj))
+
+def capture_state(obj, fields=None):
+    state = {}
+    for name in fields if fields is not None else state_fields(obj):
+        value = getattr(obj, name)
+        # Copy containers one level deep so in-place appends can be rolled back
+        if isinstance(value, (list, dict)):
+            value = value.copy()
+        state[name] = value
+    return state
+
+def restore_state(obj, state):
+    for name, value in state.items():
+        if isinstance(value, (list, dict)):
+            value = value.copy()
+        setattr(obj, name, value)
+
+class UndoHistory:
+    def __init__(self, limit=50):
+        self.limit = limit
+        self.undo_stack = []
+        self.redo_stack = []
+        self.pending = None
+
+    def begin(self, *objects):
+        self.pending = {}
+        self.touch(*objects)
+
+    def touch(self, *objects):
+        # Copy on first write only; later touches of the same object are free
+        if self.pending is None:
+            return
+        for obj in objects:
+            if obj is not None and id(obj) not in self.pending:
+                self.pending[id(obj)] = (obj, capture_state(obj))
+
+    def commit(self):
+        if self.pending is None:
+            return False
+        # Keep only the fields that actually changed
+        snapshot = []
+        for obj, state in self.pending.values():
+            current = capture_state(obj, state)
+            changed = {name: value for name, value in state.items() if current[name] != value}
+            if changed:
+                snapshot.append((obj, changed))
+        self.pending = None
+        if not snapshot:
+            return False
+        self.undo_stack.append(snapshot)
+        if len(self.undo_stack) > self.limit:
+            self.undo_stack.pop(0)
+        self.redo_stack.clear()
+        return True
+
+    def swap(self, source, target):
+        if not source:
+            return None
+        snapshot = source.pop()
+        # Record the current state of the same objects so the step can be reversed
+        target.append([(obj, capture_state(obj, state)) for obj, state in snapshot])
+        for obj, state in snapshot:
+            restore_state(obj, state)
+        return [obj for obj, state in snapshot]
+
+    def undo(self):
+        return self.swap(self.undo_stack, self.redo_stack)
+
+    def redo(self):
+        return self.swap(self.redo_stack, self.undo_stack)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.pending = None
+
+# Metrics Classes
+# A small registry of counters, gauges and histograms that can be scraped in
+# Prometheus text format over HTTP or dumped periodically as JSON.
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + '}'
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=None, func=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels or {}
+        self.func = func  # Read the value lazily at export time instead of storing it
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def current(self):
+        return self.func() if self.func else self.value
+
+    def samples(self):
+        value = self.current()
+        if value is not None:
+            yield self.name, self.labels, value
+
+    def to_json(self):
+        return {'labels': self.labels, 'value': self.current()}
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class HistogramTimer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=None, buckets=METRICS_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = sorted(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        with self.lock:
+            self.count += 1
+            self.sum += value
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[index] += 1
+                    break
+
+    def time(self):
+        return HistogramTimer(self)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.bucket_counts), self.count, self.sum
+
+    def samples(self):
+        bucket_counts, count, total = self.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            yield self.name + '_bucket', dict(self.labels, le=repr(float(bound))), cumulative
+        yield self.name + '_bucket', dict(self.labels, le='+Inf'), count
+        yield self.name + '_sum', self.labels, total
+        yield self.name + '_count', self.labels, count
+
+    def to_json(self):
+        bucket_counts, count, total = self.snapshot()
+        return {'labels': self.labels, 'count': count, 'sum': total,
+                'buckets': dict(zip((str(bound) for bound in self.buckets), bucket_counts))}
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}  # (name, sorted labels) -> metric
+        self.lock = threading.Lock()
+
+    def register(self, metric_class, name, help_text, labels=None, **kwargs):
+        # Registering the same name and labels again returns the existing metric
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = metric_class(name, help_text, labels, **kwargs)
+            elif 'func' in kwargs:
+                metric.func = kwargs['func']
+        return metric
+
+    def counter(self, name, help_text, labels=None, func=None):
+        return self.register(Counter, name, help_text, labels, func=func)
+
+    def gauge(self, name, help_text, labels=None, func=None):
+        return self.register(Gauge, name, help_text, labels, func=func)
+
+    def histogram(self, name, help_text, labels=None, buckets=METRICS_BUCKETS):
+        return self.register(Histogram, name, help_text, labels, buckets=buckets)
+
+    def grouped(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        groups = {}
+        for metric in metrics:
+            groups.setdefault(metric.name, []).append(metric)
+        return groups
+
+    def render_prometheus(self):
+        lines = []
+        for name, metrics in self.grouped().items():
+            lines.append(f"# HELP {name} {metrics[0].help_text}")
+            lines.append(f"# TYPE {name} {metrics[0].kind}")
+            for metric in metrics:
+                for sample_name, labels, value in metric.samples():
+                    lines.append(f"{sample_name}{format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        return {
+            'timestamp': time.time(),
+            'metrics': {name: [metric.to_json() for metric in metrics]
+                        for name, metrics in self.grouped().items()},
+        }
+
+    def dump_json(self, path):
+        # Write to a temporary file first so readers never see a partial dump
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, path)
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            body = self.registry.render_prometheus().encode()
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/metrics.json':
+            body = json.dumps(self.registry.to_dict()).encode()
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the game's console output
+
+class MetricsServer:
+    def __init__(self, registry, port=0, host='127.0.0.1'):
+        # Port 0 picks a free port, see self.port
+        handler = type('BoundMetricsHandler', (MetricsHandler,), {'registry': registry})
+        self.httpd = http.server.ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        print(f"Serving metrics on http://127.0.0.1:{self.port}/metrics")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class MetricsDumper:
+    def __init__(self, registry, path, interval=METRICS_DUMP_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.registry.dump_json(self.path)
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.registry.dump_json(self.path)  # Final dump so the last turns aren't lost
+
+METRICS = MetricsRegistry()
+
+TURNS_TOTAL = METRICS.counter('civ_turns_total', 'Turns ended')
+TURN_SECONDS = METRICS.histogram('civ_turn_duration_seconds', 'Time spent in Player.end_turn')
+TURN_PHASE_SECONDS = {
+    phase: METRICS.histogram('civ_turn_phase_duration_seconds', 'Time spent in each end of turn phase',
+                             labels={'phase': phase})
+    for phase in ('units', 'cities', 'research', 'gold')
+}
+LEGAL_ACTIONS_REBUILD_SECONDS = METRICS.histogram('civ_legal_actions_rebuild_seconds',
+                                                  'Time spent rebuilding the legal action cache at turn start')
+
+# Allocation statistics
+for generation in range(3):
+    METRICS.gauge('civ_gc_objects', 'Objects tracked by the garbage collector per generation',
+                  labels={'generation': generation}, func=lambda generation=generation: gc.get_count()[generation])
+    METRICS.counter('civ_gc_collections_total', 'Garbage collections per generation',
+                    labels={'generation': generation},
+                    func=lambda generation=generation: gc.get_stats()[generation]['collections'])
+def max_resident_memory_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def resident_memory_bytes():
+    # Current resident set size where /proc is available, otherwise the peak
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return max_resident_memory_bytes()
+
+METRICS.gauge('civ_process_resident_memory_bytes', 'Resident memory of the game process',
+              func=resident_memory_bytes)
+METRICS.gauge('civ_process_max_resident_memory_bytes', 'Peak resident memory of the game process',
+              func=max_resident_memory_bytes)
+# Detailed Python allocation figures, only reported when run with python -X tracemalloc
+METRICS.gauge('civ_traced_memory_bytes', 'Memory currently allocated by Python',
+              func=lambda: tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None)
+METRICS.gauge('civ_traced_memory_peak_bytes', 'Peak memory allocated by Python',
+              func=lambda: tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None)
+METRICS.counter('civ_unit_pool_created_total', 'Units allocated by the unit pool', func=lambda: UNIT_POOL.created)
+METRICS.counter('civ_unit_pool_reused_total', 'Units reused from the unit pool', func=lambda: UNIT_POOL.reused)
+METRICS.gauge('civ_unit_pool_free', 'Units waiting in the pool for reuse', func=lambda: len(UNIT_POOL.free))
+
 # Game Class
 class Game:
     def __init__(self):
@@ -469,6 +1358,17 @@ class Game:
         self.player = Player("Player", self.game_map)
         self.running = True
         self.current_turn = 1
+        self.history = UndoHistory()
+        self.legal_actions = LegalActions(self.game_map)
+        # The map view stops short of the button panel on the right
+        self.camera = Camera(pygame.Rect(0, 0, WIDTH - BUTTON_WIDTH - 20, HEIGHT))
+        self.sprite_cache = SpriteCache()
+        self.minimap = Minimap(self.game_map, self.player,
+                               pygame.Rect(WIDTH - BUTTON_WIDTH - 10, HEIGHT - MINIMAP_SIZE - 10, BUTTON_WIDTH, MINIMAP_SIZE))
+        self.start_turn()
+        self.animator = Animator()
+        self.sim_time = 0  # Unsimulated time carried over between frames
+        self.register_metrics()
 
         # Create main buttons
         self.main_buttons = []
@@ -510,22 +1410,91 @@ class Game:
         self.main_buttons.append(research_button)
         y += button_height + padding
 
+        # Undo and Redo buttons share a row
+        half_width = (button_width - padding) // 2
+        undo_button = Button("Undo", x, y, half_width, button_height, self.undo)
+        self.main_buttons.append(undo_button)
+        redo_button = Button("Redo", x + half_width + padding, y, half_width, button_height, self.redo)
+        self.main_buttons.append(redo_button)
+        y += button_height + padding
+
+    def register_metrics(self):
+        # Values are read when metrics are exported, so nothing is tracked per frame
+        player_labels = {'player': self.player.name}
+        METRICS.gauge('civ_turn', 'Current turn number', func=lambda: self.current_turn)
+        METRICS.gauge('civ_player_units', 'Units owned by each player', labels=player_labels,
+                      func=lambda: len(self.player.units))
+        METRICS.gauge('civ_player_cities', 'Cities owned by each player', labels=player_labels,
+                      func=lambda: len(self.player.cities))
+        METRICS.gauge('civ_player_gold', 'Gold held by each player', labels=player_labels,
+                      func=lambda: self.player.resources['Gold'])
+        METRICS.counter('civ_sprite_cache_hits_total', 'Sprite cache lookups served from the cache',
+                        func=lambda: self.sprite_cache.hits)
+        METRICS.counter('civ_sprite_cache_misses_total', 'Sprite cache lookups that scaled a new surface',
+                        func=lambda: self.sprite_cache.misses)
+        METRICS.gauge('civ_sprite_cache_bytes', 'Bytes of pre-scaled surfaces held by the sprite cache',
+                      func=lambda: self.sprite_cache.used)
+        METRICS.counter('civ_legal_actions_hits_total', 'Legal action lookups and patches served from the cache',
+                        func=lambda: self.legal_actions.hits)
+        METRICS.counter('civ_legal_actions_misses_total', 'Units whose legal actions were recomputed',
+                        func=lambda: self.legal_actions.misses)
+        METRICS.gauge('civ_undo_depth', 'Actions that can currently be undone',
+                      func=lambda: len(self.history.undo_stack))
+        METRICS.gauge('civ_animations_active', 'Unit animations currently running',
+                      func=lambda: len(self.animator.animations))
+
+    def start_turn(self):
+        # Legal actions are computed once here and patched after each action
+        self.minimap.update(self.game_map.take_changes())
+        with LEGAL_ACTIONS_REBUILD_SECONDS.time():
+            self.legal_actions.rebuild(self.player.units)
+
+    def sync_changes(self, *acted_units):
+        changes = self.game_map.take_changes()
+        self.legal_actions.update(self.player.units, changes, acted_units)
+        self.minimap.update(changes)
+
     def end_turn(self):
         self.player.end_turn()
         self.current_turn += 1
+        # Undo only reaches back to the start of the current turn
+        self.history.clear()
+        if self.player.selected_unit and self.player.selected_unit not in self.player.units:
+            self.player.selected_unit = None
+        # Nothing can reference units removed last turn any more, so they may be reused
+        UNIT_POOL.recycle()
+        self.start_turn()
         print(f"Turn {self.current_turn} started.")
         if click_sound:
             click_sound.play()
 
     def found_city(self):
-        if self.player.selected_unit and self.player.selected_unit.unit_type == 'Settler':
-            self.player.selected_unit.found_city(self.game_map)
+        if self.player.selected_unit in self.player.units and self.player.selected_unit.unit_type == 'Settler':
+            unit = self.player.selected_unit
+            if not self.legal_actions.get(unit, count_hit=True).can_found:
+                print("A city already exists here.")
+                return
+            self.history.begin(unit, self.game_map.tiles[unit.y][unit.x], self.player)
+            unit.found_city(self.game_map)
+            self.history.commit()
+            self.sync_changes(unit)
+            # The settler is gone, so it can no longer be selected or moved
+            if unit not in self.player.units:
+                self.player.selected_unit = None
+                self.clear_highlights()
         else:
             print("No settler unit selected.")
 
     def build_improvement(self):
-        if self.player.selected_unit and self.player.selected_unit.unit_type == 'Worker':
-            self.player.selected_unit.build_improvement(self.game_map)
+        if self.player.selected_unit in self.player.units and self.player.selected_unit.unit_type == 'Worker':
+            unit = self.player.selected_unit
+            if not self.legal_actions.get(unit, count_hit=True).can_improve:
+                print("Cannot build an improvement here.")
+                return
+            self.history.begin(unit, self.game_map.tiles[unit.y][unit.x])
+            unit.build_improvement(self.game_map)
+            self.history.commit()
+            self.sync_changes(unit)
         else:
             print("No worker unit selected.")
 
@@ -537,12 +1506,44 @@ class Game:
         else:
             print("No city selected.")
 
+    def undo(self):
+        restored = self.history.undo()
+        if restored is None:
+            print("Nothing to undo.")
+            return
+        self.after_history_change(restored)
+        print("Action undone.")
+
+    def redo(self):
+        restored = self.history.redo()
+        if restored is None:
+            print("Nothing to redo.")
+            return
+        self.after_history_change(restored)
+        print("Action redone.")
+
+    def after_history_change(self, restored):
+        self.animator.clear()
+        for obj in restored:
+            if isinstance(obj, Tile):
+                self.game_map.mark_changed(obj.x, obj.y)
+        self.sync_changes(*[obj for obj in restored if isinstance(obj, Unit)])
+        # Drop a selection that no longer exists after rolling state back or forward
+        if self.player.selected_unit and self.player.selected_unit not in self.player.units:
+            self.player.selected_unit = None
+        if self.player.selected_city and self.player.selected_city not in self.player.cities:
+            self.player.selected_city = None
+            self.player.show_city_menu = False
+        self.clear_highlights()
+        if click_sound:
+            click_sound.play()
+
     def game_loop(self):
         while self.running:
+            dt = clock.tick(60) / 1000
             self.handle_events()
-            self.update()
+            self.update(dt)
             self.draw()
-            clock.tick(60)
         pygame.quit()
         sys.exit()
 
@@ -556,14 +1557,38 @@ class Game:
                     pos = event.pos
                     self.handle_main_button_click(event, pos)
                     self.handle_menu_button_click(event, pos)
-                    self.handle_tile_click(pos)
+                    if not self.handle_minimap_click(pos):
+                        self.handle_tile_click(pos)
+
+            elif event.type == pygame.MOUSEWHEEL:
+                # Horizontal scrolling has y == 0 and doesn't zoom
+                if event.y and not self.menu_open():
+                    self.camera.zoom(1 if event.y > 0 else -1)
 
             elif event.type == pygame.KEYDOWN:
+                if self.menu_open():
+                    pass  # The map view stays put while a management menu is open
+                elif event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                    self.camera.zoom(1)
+                elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                    self.camera.zoom(-1)
+                elif event.key in CAMERA_PAN_KEYS:
+                    self.camera.pan(*CAMERA_PAN_KEYS[event.key])
+                if event.mod & pygame.KMOD_CTRL:
+                    if event.key == pygame.K_z and event.mod & pygame.KMOD_SHIFT:
+                        self.redo()
+                    elif event.key == pygame.K_z:
+                        self.undo()
+                    elif event.key == pygame.K_y:
+                        self.redo()
                 if self.player.show_research_menu:
                     self.handle_research_input(event.key)
                 if self.player.show_city_menu:
                     self.handle_city_input(event.key)
 
+    def menu_open(self):
+        return self.player.show_city_menu or self.player.show_research_menu
+
     def handle_main_button_click(self, event, pos):
         for button in self.main_buttons:
             button.handle_event(event, pos)
@@ -576,8 +1601,20 @@ class Game:
             for button in self.city_buttons:
                 button.handle_event(event, pos)
 
+    def handle_minimap_click(self, pos):
+        if self.player.show_city_menu or self.player.show_research_menu:
+            return False
+        target = self.minimap.screen_to_tile(pos)
+        if target is None:
+            return False
+        self.camera.center_on(*target)
+        return True
+
     def handle_tile_click(self, pos):
-        x, y = pos[0] // TILE_SIZE, pos[1] // TILE_SIZE
+        target = self.camera.screen_to_tile(pos)
+        if target is None:
+            return
+        x, y = target
         if 0 <= x < MAP_WIDTH and 0 <= y < MAP_HEIGHT:
             tile = self.game_map.tiles[y][x]
             if self.player.show_city_menu or self.player.show_research_menu:
@@ -598,11 +1635,26 @@ class Game:
                 tile.highlight = True
                 print(f"City selected at ({x}, {y})")
             elif self.player.selected_unit:
-                # Move unit
-                dx = x - self.player.selected_unit.x
-                dy = y - self.player.selected_unit.y
-                if abs(dx) + abs(dy) == 1 and self.player.selected_unit.moves > 0:
-                    self.player.selected_unit.move_unit(dx, dy, self.game_map)
+                # Move unit along the cached shortest path, attacking at the end if the target is an enemy
+                unit = self.player.selected_unit
+                path = self.legal_actions.path_to(unit, x, y)
+                if path:
+                    self.history.begin(unit, self.game_map.tiles[unit.y][unit.x])
+                    for step_x, step_y in path:
+                        self.history.touch(self.game_map.tiles[step_y][step_x])
+                    if tile.unit:
+                        self.history.touch(tile.unit, tile.unit.owner)
+                    waypoints = [(unit.x, unit.y)]
+                    attack_target = None
+                    for step_x, step_y in path:
+                        unit.move_unit(step_x - unit.x, step_y - unit.y, self.game_map)
+                        if (unit.x, unit.y) == (step_x, step_y):
+                            waypoints.append((step_x, step_y))
+                        else:
+                            attack_target = (step_x, step_y)
+                    self.animator.move(unit, waypoints, attack_target)
+                    self.history.commit()
+                    self.sync_changes(unit)
                     self.clear_highlights()
                 else:
                     print("Invalid move.")
@@ -614,19 +1666,41 @@ class Game:
             for tile in row:
                 tile.highlight = False
 
-    def update(self):
-        pass  # Future game logic updates
+    def update(self, dt=0):
+        # Advance the simulation in fixed steps; leftover time is used to interpolate when drawing
+        self.sim_time = min(self.sim_time + dt, MAX_SIM_STEPS * SIM_STEP)
+        while self.sim_time >= SIM_STEP:
+            self.animator.step(SIM_STEP)
+            self.sim_time -= SIM_STEP
 
     def draw(self):
         window.fill(BLACK)
-        self.game_map.draw(window)
+        window.set_clip(self.camera.viewport)
+        if self.camera.tile_size < OVERVIEW_TILE_SIZE:
+            self.game_map.draw_overview(window, self.camera, self.sprite_cache, [self.player], self.animator.animations)
+        else:
+            self.game_map.draw(window, self.camera, self.sprite_cache, self.animator.animations)
+        self.animator.draw(window, self.camera, self.sprite_cache, self.sim_time / SIM_STEP)
+        self.draw_move_range()
+        window.set_clip(None)
         self.draw_ui()
+        self.minimap.draw(window, self.camera)
         if self.player.show_research_menu:
             self.draw_research_menu()
         if self.player.show_city_menu:
             self.draw_city_menu()
         pygame.display.flip()
 
+    def draw_move_range(self):
+        unit = self.player.selected_unit
+        if not unit or unit not in self.player.units:
+            return
+        actions = self.legal_actions.get(unit)
+        for x, y in actions.reachable:
+            pygame.draw.rect(window, LIGHT_BLUE, self.camera.tile_rect(x, y), 2)
+        for x, y in actions.attacks:
+            pygame.draw.rect(window, RED, self.camera.tile_rect(x, y), 2)
+
     def draw_ui(self):
         # Draw main buttons
         for button in self.main_buttons:
@@ -798,7 +1872,9 @@ class Game:
     def select_production(self, item):
         city = self.player.selected_city
         if self.player.resources['Gold'] >= PRODUCTION_COSTS.get(item, 0):
+            self.history.begin(city, self.player)
             city.change_production(item)
+            self.history.commit()
             print(f"{item} added to production queue in {city.name}")
         else:
             print("Not enough Gold to produce this item.")
@@ -810,5 +1886,15 @@ class Game:
 
 # Main Execution
 if __name__ == "__main__":
+    metrics_server = MetricsServer(METRICS, METRICS_PORT) if METRICS_PORT is not None else None
+    metrics_dumper = MetricsDumper(METRICS, METRICS_JSON_PATH) if METRICS_JSON_PATH else None
+    for service in (metrics_server, metrics_dumper):
+        if service:
+            service.start()
     game = Game()
-    game.game_loop()
+    try:
+        game.game_loop()
+    finally:
+        for service in (metrics_server, metrics_dumper):
+            if service:
+                service.stop()